@@ -1,9 +1,10 @@
-from fastapi import FastAPI, HTTPException, Response, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Response, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import discid
-import musicbrainzngs
-import subprocess
+import diskcache
+import httpx
+import orjson
 import os
 import asyncio
 from pydantic import BaseModel
@@ -11,12 +12,20 @@ import logging
 import time
 import shutil
 from typing import Dict, Optional, List
+from collections import OrderedDict, deque
 import sys
-import signal
 import psutil
+import socket
+from uvicorn.protocols.http.httptools_impl import HttpToolsProtocol
 import json
 from datetime import datetime
 import xml.etree.ElementTree as ET
+import threading
+import struct
+import re
+import select
+import functools
+from contextlib import asynccontextmanager
 
 # Configure logging with more detailed format
 logging.basicConfig(
@@ -33,7 +42,23 @@ logger.info(f"Starting CD Player backend service")
 # Global cleanup flag
 cleanup_in_progress = False
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the background tasks for the lifetime of the app, release resources on shutdown"""
+    tasks = [
+        asyncio.create_task(buffer_manager.periodic_stats()),
+        asyncio.create_task(periodic_cleanup())
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await graceful_shutdown()
+        await musicbrainz_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,15 +69,146 @@ app.add_middleware(
     expose_headers=["Content-Type", "Content-Range", "Content-Length", "Accept-Ranges"]
 )
 
-musicbrainzngs.set_useragent("WebCDPlayer", "1.0")
+MUSICBRAINZ_DISCID_URL = "https://musicbrainz.org/ws/2/discid/{disc_id}"
+musicbrainz_client = httpx.AsyncClient(
+    headers={"User-Agent": "WebCDPlayer/1.0", "Accept": "application/json"},
+    timeout=10.0
+)
+
+STREAM_SNDBUF_SIZE = 2 * 1024 * 1024  # Socket send buffer for audio streams
+ZEROCOPY_SEND = "http.response.zerocopysend"  # ASGI extension served with os.splice
+SPLICE_CHUNK_SIZE = 65536
+
+def splice_to_socket(in_fd: int, out_fd: int, count: int) -> int:
+    """Move up to count bytes from a pipe to a socket in the kernel, returns bytes moved"""
+    sent = 0
+    while sent < count:
+        select.select([in_fd], [], [], 1.0)
+        try:
+            n = os.splice(in_fd, out_fd, min(count - sent, SPLICE_CHUNK_SIZE), flags=os.SPLICE_F_MOVE)
+        except BlockingIOError:
+            # The pipe was readable, so the socket is full
+            select.select([], [out_fd], [], 1.0)
+            continue
+        if n == 0:
+            break
+        sent += n
+    return sent
+
+async def zerocopy_send(cycle, send, message):
+    """ASGI send that serves zerocopysend messages by splicing the file to the client socket"""
+    if message["type"] != ZEROCOPY_SEND:
+        await send(message)
+        return
+    if not cycle.response_started or cycle.response_complete or cycle.chunked_encoding:
+        raise RuntimeError("zerocopysend needs a started response with a Content-Length")
+
+    transport = cycle.transport
+    # Anything uvicorn already queued has to reach the socket before our bytes do
+    while transport.get_write_buffer_size():
+        if transport.is_closing():
+            return
+        await asyncio.sleep(0.005)
+
+    sock = transport.get_extra_info("socket")
+    count = message.get("count", cycle.expected_content_length)
+    sent = await asyncio.to_thread(splice_to_socket, message["file"].fileno(), sock.fileno(), count)
+    cycle.expected_content_length -= sent
+    if sent < count:
+        # The file ended short of the promised count, pad with zeros (silence for PCM)
+        logger.warning(f"Zero-copy source ended {count - sent} bytes short, padding with silence")
+        while sent < count:
+            pad = min(count - sent, SPLICE_CHUNK_SIZE)
+            await send({"type": "http.response.body", "body": bytes(pad), "more_body": True})
+            sent += pad
+    await send({"type": "http.response.body", "body": b"", "more_body": message.get("more_body", False)})
+
+class StreamingHttpProtocol(HttpToolsProtocol):
+    """HTTP protocol that tunes accepted sockets for real-time audio streaming
+
+    Zero-copy send hooks into uvicorn internals (on_headers_complete and the
+    RequestResponseCycle attributes used by zerocopy_send), so uvicorn and
+    httptools are pinned in requirements.txt to the versions this was tested with.
+    """
+    def connection_made(self, transport):
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, STREAM_SNDBUF_SIZE)
+            except OSError as e:
+                logger.debug(f"Could not tune client socket: {e}")
+        super().connection_made(transport)
+
+    def on_headers_complete(self):
+        # os.splice needs Python 3.10+ on Linux, without it apps use their fallback
+        if hasattr(os, "splice"):
+            self.scope.setdefault("extensions", {})[ZEROCOPY_SEND] = {}
+        super().on_headers_complete()
+        cycle = self.cycle
+        if hasattr(os, "splice") and cycle is not None and cycle.scope is self.scope:
+            cycle.send = functools.partial(zerocopy_send, cycle, cycle.send)
 
 # Cache for CD info
 cd_info_cache = {
     "last_check": 0,
     "disc_id": None,
-    "info": None
+    "info": None,
+    "json_bytes": None,  # Serialized info, served as-is by /cd/info
+    "track_sizes": []  # Raw PCM byte size of each track
+}
+
+# CD audio is 44.1kHz 16-bit stereo PCM, 2352 bytes per sector
+CD_SAMPLE_RATE = 44100
+CD_CHANNELS = 2
+CD_BITS_PER_SAMPLE = 16
+CD_SECTOR_SIZE = 2352
+WAV_HEADER_SIZE = 44
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF - 36  # Conventional data size for streams of unknown length
+
+def wav_header(data_size: Optional[int] = None) -> bytes:
+    """Build the WAV header cdparanoia would emit for data_size bytes of CD audio"""
+    if data_size is None:
+        data_size = WAV_UNKNOWN_SIZE
+    block_align = CD_CHANNELS * CD_BITS_PER_SAMPLE // 8
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, CD_CHANNELS, CD_SAMPLE_RATE,
+        CD_SAMPLE_RATE * block_align, block_align, CD_BITS_PER_SAMPLE,
+        b'data', data_size
+    )
+
+def track_pcm_size(track_number: int) -> Optional[int]:
+    """Raw PCM size of a track on the current disc, if known"""
+    sizes = cd_info_cache["track_sizes"]
+    if 1 <= track_number <= len(sizes):
+        return sizes[track_number - 1]
+    return None
+
+# Last TOC read, reused briefly so repeated polls don't re-read the disc
+TOC_CACHE_TTL = 5  # seconds
+_toc_cache = {
+    "mtime": None,
+    "disc": None,
+    "t": 0
 }
 
+# MusicBrainz results persisted across restarts, keyed by disc ID
+CD_INFO_STORE_TTL = 86400  # 1 day
+CD_INFO_CACHE_DIR = os.environ.get("CD_INFO_CACHE_DIR", "/var/cache/cdplayer")
+_cd_info_store = None
+
+def get_cd_info_store() -> Optional[diskcache.Cache]:
+    """Open the persistent CD info store on first use, None if the directory isn't writable"""
+    global _cd_info_store
+    if _cd_info_store is None:
+        try:
+            _cd_info_store = diskcache.Cache(CD_INFO_CACHE_DIR)
+        except Exception as e:
+            logger.warning(f"Persistent CD info cache disabled, can't open {CD_INFO_CACHE_DIR}: {e}")
+            _cd_info_store = False  # Don't retry on every lookup
+    return _cd_info_store if _cd_info_store is not False else None
+
 class TrackInfo(BaseModel):
     number: int
     title: str
@@ -78,34 +234,87 @@ class SystemStatus(BaseModel):
     current_track: Optional[int]
     next_track: Optional[int]
 
+TRACK_BUFFER_SIZE = 1024 * 1024 * 10  # 10MB buffer limit per track
+STREAM_SLICE_SIZE = 65536  # Size of buffered data slices handed to the response
+
+class BufferPool:
+    """Process-wide pool of pre-allocated track buffers"""
+    _free: deque = deque()
+    _lock = threading.Lock()
+    max_free = 3
+
+    @classmethod
+    def acquire(cls) -> bytearray:
+        with cls._lock:
+            if cls._free:
+                return cls._free.popleft()
+        return bytearray(TRACK_BUFFER_SIZE)
+
+    @classmethod
+    def release(cls, buf: bytearray):
+        with cls._lock:
+            if len(cls._free) < cls.max_free:
+                cls._free.append(buf)
+
 class TrackBuffer:
     def __init__(self, track_number: int):
         self.track_number = track_number
-        self.data = bytearray()
-        self.complete = False
+        self.data = BufferPool.acquire()  # Filled up to write_offset
+        self.view = memoryview(self.data)  # Shared by the writer and all readers
+        self.write_offset = 0
+        self.complete = False  # Whole track is in the buffer
+        self.full = False  # Buffer hit its size cap before the end of the track
+        self.data_ready = asyncio.Event()  # Set whenever the producer makes progress
+        self.initial_ready = asyncio.Event()  # Set once enough data is buffered to start playback
         self.generator = None
         self.start_time = time.time()
         self.size = 0
         self.error = None
+        self.readers = 0  # Streams currently serving from data
+        self.cleared = False  # Removed from the manager, storage goes back once unread
+        self.released = False
+
+    def release_storage(self):
+        """Return the storage to the pool once cleared and no reader still holds views of it"""
+        if self.cleared and self.readers == 0 and not self.released:
+            self.released = True
+            BufferPool.release(self.data)
+
+    @property
+    def finished(self) -> bool:
+        """Whether no more data will be written to the buffer"""
+        return self.complete or self.full or self.error is not None
+
+    def slices(self, start: int = 0, end: Optional[int] = None, size: int = STREAM_SLICE_SIZE):
+        """Yield zero-copy views over the buffered data between start and end"""
+        end = self.write_offset if end is None else end
+        for i in range(start, end, size):
+            yield self.view[i:min(i + size, end)]
 
     def get_status(self) -> BufferStatus:
         return BufferStatus(
             track_number=self.track_number,
-            buffer_size=len(self.data),
+            buffer_size=self.write_offset,
             complete=self.complete,
-            memory_usage=len(self.data) / (1024 * 1024),  # MB
+            memory_usage=self.write_offset / (1024 * 1024),  # MB
             buffering_time=time.time() - self.start_time
         )
 
 class TrackBufferManager:
     def __init__(self):
-        self.buffers: Dict[int, TrackBuffer] = {}
+        self.buffers: OrderedDict[int, TrackBuffer] = OrderedDict()  # Ordered least to most recently used
         self.current_track = None
         self.next_track = None
         self._lock = asyncio.Lock()
-        self.max_buffer_size = 1024 * 1024 * 10  # 10MB buffer limit per track
+        self.max_buffer_size = TRACK_BUFFER_SIZE
         self.max_total_buffers = 3  # Maximum number of tracks to buffer
-        self.last_access = {}
+        self.initial_buffer_size = 512 * 1024  # Data priority buffers wait for before returning
+        BufferPool.max_free = self.max_total_buffers
+        self.stats_interval = 2  # Seconds between system stat samples
+        self._process = psutil.Process()
+        self._cached_cpu = 0.0
+        self._cached_mem_total = 0.0
+        self._cached_mem_used = 0.0
 
     async def start_buffering(self, track_number: int, priority: bool = False):
         """Start buffering a track in memory"""
@@ -114,72 +323,109 @@ class TrackBufferManager:
             await self._cleanup_old_buffers()
 
             if track_number in self.buffers:
-                self.last_access[track_number] = time.time()
-                return
-
-            logger.debug(f"Starting buffer for track {track_number} (priority: {priority})")
-            buffer = TrackBuffer(track_number)
-            self.buffers[track_number] = buffer
-            self.last_access[track_number] = time.time()
+                self.buffers.move_to_end(track_number)
+                buffer = self.buffers[track_number]
+            else:
+                logger.debug(f"Starting buffer for track {track_number} (priority: {priority})")
+                buffer = TrackBuffer(track_number)
+                self.buffers[track_number] = buffer
 
-            try:
-                buffer.generator = AudioChunkGenerator(track_number)
-                await buffer.generator.start()
-                if priority:
-                    # For priority buffers, wait for some initial data
-                    await self._buffer_initial_data(track_number)
-                asyncio.create_task(self._buffer_track(track_number))
-            except Exception as e:
-                logger.error(f"Error starting buffer for track {track_number}: {e}")
-                await self.clear_buffer(track_number)
+                try:
+                    buffer.generator = AudioChunkGenerator(track_number)
+                    await buffer.generator.start()
+                    asyncio.create_task(self._buffer_track(track_number))
+                except Exception as e:
+                    logger.error(f"Error starting buffer for track {track_number}: {e}")
+                    await self._clear_buffer(track_number)
+                    return
 
-    async def _buffer_initial_data(self, track_number: int, initial_size: int = 512 * 1024):
-        """Buffer initial data for priority tracks"""
-        buffer = self.buffers[track_number]
-        try:
-            async for chunk in buffer.generator.generate():
-                buffer.data.extend(chunk)
-                if len(buffer.data) >= initial_size:
-                    break
-        except Exception as e:
-            logger.error(f"Error buffering initial data for track {track_number}: {e}")
+        if priority:
+            # For priority buffers, wait for some initial data
+            await buffer.initial_ready.wait()
 
     async def _buffer_track(self, track_number: int):
         """Buffer track data in memory"""
+        buffer = self.buffers.get(track_number)
+        if buffer is None:
+            return
         try:
-            buffer = self.buffers[track_number]
-            async for chunk in buffer.generator.generate():
-                if len(buffer.data) < self.max_buffer_size:
-                    buffer.data.extend(chunk)
-                    buffer.size = len(buffer.data)
-                else:
+            while buffer.write_offset < self.max_buffer_size:
+                n = await buffer.generator.readinto(buffer.view[buffer.write_offset:self.max_buffer_size])
+                if not n:
+                    if buffer.generator.eof:
+                        buffer.complete = True
+                    else:
+                        buffer.error = "Reader stopped"
                     break
-            buffer.complete = True
-            logger.debug(f"Track {track_number} buffering complete, size: {buffer.size} bytes")
+                buffer.write_offset += n
+                buffer.size = buffer.write_offset
+                buffer.data_ready.set()
+                if not buffer.initial_ready.is_set() and buffer.write_offset >= self.initial_buffer_size:
+                    buffer.initial_ready.set()
+            else:
+                buffer.full = True
+            logger.debug(f"Track {track_number} buffering finished (complete: {buffer.complete}), size: {buffer.size} bytes")
         except Exception as e:
             logger.error(f"Error buffering track {track_number}: {e}")
             buffer.error = str(e)
             await self.clear_buffer(track_number)
+        finally:
+            buffer.initial_ready.set()
+            buffer.data_ready.set()
 
     async def get_track_stream(self, track_number: int):
         """Get a stream of track data, either from buffer or direct"""
-        self.last_access[track_number] = time.time()
-        
+        yield wav_header(track_pcm_size(track_number))
+        served = 0
         if track_number in self.buffers:
+            self.buffers.move_to_end(track_number)
             buffer = self.buffers[track_number]
-            if buffer.complete:
-                logger.debug(f"Serving track {track_number} from buffer")
-                yield bytes(buffer.data)
+            logger.debug(f"Serving track {track_number} from buffer (complete: {buffer.complete})")
+            # Keep the storage checked out of the pool while we hold views of it
+            buffer.readers += 1
+            try:
+                # Follow the producer, waiting for new data instead of serving a stale snapshot
+                while True:
+                    if served < buffer.write_offset:
+                        end = buffer.write_offset
+                        for chunk in buffer.slices(served, end):
+                            yield chunk
+                            chunk = None
+                        served = end
+                        continue
+                    if buffer.finished:
+                        break
+                    buffer.data_ready.clear()
+                    await buffer.data_ready.wait()
+            finally:
+                buffer.readers -= 1
+                buffer.release_storage()
+            if buffer.complete and buffer.error is None:
+                return
+            if buffer.full and buffer.error is None and buffer.generator and not buffer.generator.stopped:
+                # The buffer's reader stopped exactly at the cap, take it over
+                logger.debug(f"Continuing track {track_number} from the buffer's reader")
+                generator, buffer.generator = buffer.generator, None
+                async for chunk in wav_stream(generator):
+                    yield chunk
+                    chunk = None
                 return
-            elif len(buffer.data) > 0:
-                logger.debug(f"Serving track {track_number} from partial buffer")
-                yield bytes(buffer.data)
 
-        logger.debug(f"Serving track {track_number} directly")
-        generator = AudioChunkGenerator(track_number)
+        # Another stream may already own this track's reader, e.g. one that took over
+        # a full buffer. The drive allows one reader, so wait for it to finish.
+        while True:
+            existing = active_generators.get(track_number)
+            if existing is None or existing.stopped:
+                break
+            logger.debug(f"Waiting for the current reader of track {track_number}")
+            await existing.wait_stopped()
+
+        logger.debug(f"Serving track {track_number} directly from byte {served}")
+        generator = AudioChunkGenerator(track_number, served // CD_SECTOR_SIZE)
         await generator.start()
-        async for chunk in generator.generate():
+        async for chunk in wav_stream(generator, skip=served % CD_SECTOR_SIZE):
             yield chunk
+            chunk = None
 
     async def prepare_next_track(self, current_track: int, total_tracks: int):
         """Prepare the next track if available"""
@@ -190,47 +436,59 @@ class TrackBufferManager:
             await self.start_buffering(next_track)
 
     async def _cleanup_old_buffers(self):
-        """Clean up old buffers based on access time and memory usage"""
-        if len(self.buffers) >= self.max_total_buffers:
-            # Sort buffers by last access time
-            sorted_buffers = sorted(
-                self.last_access.items(),
-                key=lambda x: x[1]
-            )
-            # Remove oldest buffers until we're under the limit
-            while len(self.buffers) >= self.max_total_buffers:
-                oldest_track = sorted_buffers[0][0]
-                await self.clear_buffer(oldest_track)
-                sorted_buffers.pop(0)
+        """Evict least recently used buffers until there is room for a new one"""
+        while len(self.buffers) >= self.max_total_buffers:
+            oldest_track = next(iter(self.buffers))
+            await self._clear_buffer(oldest_track)
+
+    async def _clear_buffer(self, track_number: int):
+        """Clear a track's buffer, caller must hold the lock"""
+        buffer = self.buffers.pop(track_number, None)
+        if buffer is None:
+            return
+        if buffer.generator:
+            await buffer.generator.stop()
+        # Wake any reader waiting on the producer, the last one out releases the storage
+        buffer.error = buffer.error or "Buffer cleared"
+        buffer.cleared = True
+        buffer.data_ready.set()
+        buffer.release_storage()
+        logger.debug(f"Cleared buffer for track {track_number}")
 
     async def clear_buffer(self, track_number: int):
         """Clear a track's buffer"""
         async with self._lock:
-            if track_number in self.buffers:
-                buffer = self.buffers[track_number]
-                if buffer.generator:
-                    await buffer.generator.stop()
-                del self.buffers[track_number]
-                if track_number in self.last_access:
-                    del self.last_access[track_number]
-                logger.debug(f"Cleared buffer for track {track_number}")
+            await self._clear_buffer(track_number)
 
     async def clear_all_buffers(self):
         """Clear all track buffers"""
         async with self._lock:
             for track_number in list(self.buffers.keys()):
-                await self.clear_buffer(track_number)
+                await self._clear_buffer(track_number)
             self.current_track = None
             self.next_track = None
-            self.last_access.clear()
+
+    def _sample_stats(self):
+        """Refresh cached CPU and memory figures"""
+        self._cached_cpu = self._process.cpu_percent()
+        self._cached_mem_total = psutil.virtual_memory().total / (1024 * 1024)
+        self._cached_mem_used = self._process.memory_info().rss / (1024 * 1024)
+
+    async def periodic_stats(self):
+        """Periodically sample system stats so status requests don't hit /proc"""
+        while True:
+            try:
+                self._sample_stats()
+            except Exception as e:
+                logger.error(f"Error sampling system stats: {e}")
+            await asyncio.sleep(self.stats_interval)
 
     def get_status(self) -> SystemStatus:
         """Get current buffer and system status"""
-        process = psutil.Process()
         return SystemStatus(
-            total_memory=psutil.virtual_memory().total / (1024 * 1024),
-            used_memory=process.memory_info().rss / (1024 * 1024),
-            cpu_percent=process.cpu_percent(),
+            total_memory=self._cached_mem_total,
+            used_memory=self._cached_mem_used,
+            cpu_percent=self._cached_cpu,
             active_buffers=[buffer.get_status() for buffer in self.buffers.values()],
             current_track=self.current_track,
             next_track=self.next_track
@@ -253,63 +511,138 @@ def create_generic_cd_info(disc):
         tracks=tracks
     )
 
+def cdparanoia_cpus() -> Optional[set]:
+    """CPUs for cdparanoia to run on, leaving the lowest CPU free for the event loop"""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = os.sched_getaffinity(0)
+    if len(cpus) < 2:
+        return None
+    return cpus - {min(cpus)}
+
 class AudioChunkGenerator:
-    def __init__(self, track_number: int):
+    CHUNK_SIZE = 16384
+    running_processes = set()  # cdparanoia processes we spawned and haven't seen exit
+
+    def __init__(self, track_number: int, start_sector: int = 0):
         self.track_number = track_number
+        self.start_sector = start_sector
         self.process = None
+        self.stdout_fd = None
         self.stopped = False
+        self._stopped_event = asyncio.Event()
+        self.eof = False
         self.bytes_read = 0
         self.initialized = False
 
     async def start(self):
         if self.initialized:
             return
+
+        # /dev/cdrom is a single-reader device, only one cdparanoia per track
+        existing = active_generators.get(self.track_number)
+        if existing is not None and existing is not self and not existing.stopped:
+            raise RuntimeError(f"Track {self.track_number} is already being read")
+        active_generators[self.track_number] = self
         
-        logger.debug(f"Starting generator for track {self.track_number}")
+        logger.debug(f"Starting generator for track {self.track_number} at sector {self.start_sector}")
+        if self.start_sector:
+            span = f'{self.track_number}[.{self.start_sector}]-{self.track_number}'
+        else:
+            span = f'{self.track_number}:{self.track_number}'
+        # Own the stdout pipe so output can be read straight into caller buffers
+        read_fd, write_fd = os.pipe()
         try:
+            self.stdout_fd = read_fd
+            os.set_blocking(read_fd, False)
             self.process = await asyncio.create_subprocess_exec(
                 'cdparanoia',
                 '--force-cdrom-device=/dev/cdrom',
                 '--verbose',
-                '--output-wav',
+                '--output-raw-little-endian',  # WAV header is added by the backend
                 '--never-skip=40',  # More aggressive reading
                 '--sample-offset=0',  # Prevent initial offset
-                f'{self.track_number}:{self.track_number}',
+                span,
                 '-',
-                stdout=asyncio.subprocess.PIPE,
+                stdout=write_fd,
                 stderr=asyncio.subprocess.PIPE
             )
+            os.close(write_fd)
+            write_fd = None
+            AudioChunkGenerator.running_processes.add(self.process)
+
+            # Keep read-retry CPU spikes away from the core serving requests
+            cpus = cdparanoia_cpus()
+            if cpus:
+                try:
+                    os.sched_setaffinity(self.process.pid, cpus)
+                except OSError as e:
+                    logger.debug(f"Could not set cdparanoia CPU affinity: {e}")
 
-            async def log_stderr():
+            async def log_stderr(stderr):
                 while True:
-                    line = await self.process.stderr.readline()
+                    line = await stderr.readline()
                     if not line:
                         break
-                    logger.debug(f"cdparanoia: {line.decode().strip()}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("cdparanoia: %s", line.decode(errors="replace").rstrip())
             
-            asyncio.create_task(log_stderr())
+            asyncio.create_task(log_stderr(self.process.stderr))
             self.initialized = True
             logger.debug(f"Process started for track {self.track_number}")
         except Exception as e:
             logger.error(f"Error starting process: {e}")
+            if write_fd is not None:
+                os.close(write_fd)
             await self.stop()
             raise
 
+    async def _wait_readable(self):
+        """Wait until the stdout pipe has data or reaches EOF"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(self.stdout_fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(self.stdout_fd)
+
+    async def _read_pipe(self, read):
+        """Run a non-blocking read on the stdout pipe, waiting while it is empty"""
+        while not self.stopped and self.stdout_fd is not None:
+            try:
+                result = read(self.stdout_fd)
+            except BlockingIOError:
+                await self._wait_readable()
+                continue
+            if not result:
+                self.eof = True
+            return result
+        return None
+
+    async def readinto(self, target: memoryview) -> int:
+        """Read cdparanoia output directly into target, returns 0 at EOF"""
+        n = await self._read_pipe(lambda fd: os.readv(fd, [target]))
+        if n:
+            self.bytes_read += n
+        return n or 0
+
     async def generate(self):
         try:
-            CHUNK_SIZE = 16384  # Increased chunk size
+            CHUNK_SIZE = self.CHUNK_SIZE
             logger.debug(f"Starting audio streaming with chunk size: {CHUNK_SIZE}")
             
-            while not self.stopped and self.process and self.process.stdout:
-                chunk = await self.process.stdout.read(CHUNK_SIZE)
+            while not self.stopped and self.stdout_fd is not None:
+                chunk = await self._read_pipe(lambda fd: os.read(fd, CHUNK_SIZE))
                 if not chunk:
                     logger.debug("No more data from cdparanoia")
                     break
 
                 self.bytes_read += len(chunk)
                 if self.bytes_read % (CHUNK_SIZE * 64) == 0:
-                    logger.debug(f"Streaming progress: {self.bytes_read/1024:.2f}KB")
+                    logger.debug("Streaming progress: %.2fKB", self.bytes_read / 1024)
                 yield chunk
+                chunk = None  # Don't hold the chunk across the next read
 
         except Exception as e:
             logger.error(f"Error in generate: {e}")
@@ -318,25 +651,184 @@ class AudioChunkGenerator:
             logger.debug(f"Streaming complete. Total bytes read: {self.bytes_read}")
             await self.stop()
 
+    async def wait_stopped(self):
+        """Wait until this generator has been stopped"""
+        await self._stopped_event.wait()
+
     async def stop(self):
         logger.debug(f"Stopping generator for track {self.track_number}")
         self.stopped = True
+        self._stopped_event.set()
+        if active_generators.get(self.track_number) is self:
+            del active_generators[self.track_number]
         
-        if self.process:
+        # Detach first so overlapping stop() calls don't handle the process twice
+        process, self.process = self.process, None
+        if process:
             try:
-                if not self.process.stdout.at_eof():
+                if process.returncode is None:
                     logger.debug("Terminating cdparanoia process")
-                    self.process.terminate()
-                await self.process.wait()
+                    process.terminate()
+                await process.wait()
                 logger.debug("cdparanoia process terminated")
             except Exception as e:
                 logger.error(f"Error stopping cdparanoia: {e}")
-            self.process = None
+            finally:
+                if process.returncode is not None:
+                    AudioChunkGenerator.running_processes.discard(process)
+
+        stdout_fd, self.stdout_fd = self.stdout_fd, None
+        if stdout_fd is not None:
+            os.close(stdout_fd)
+
+async def wav_stream(generator: AudioChunkGenerator, header: bytes = b'', skip: int = 0,
+                     limit: Optional[int] = None):
+    """Prefix raw PCM from generator with header, dropping skip bytes and stopping after limit"""
+    try:
+        if header:
+            if limit is not None:
+                header = header[:limit]
+                limit -= len(header)
+            yield header
+        async for chunk in generator.generate():
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk = chunk[skip:]
+                skip = 0
+            if limit is not None:
+                if limit <= 0:
+                    break
+                chunk = chunk[:limit]
+                limit -= len(chunk)
+            yield chunk
+            chunk = None
+        if limit and generator.eof:
+            # cdparanoia ended short of the size promised in Content-Length, pad with silence
+            logger.warning(f"cdparanoia ended {limit} bytes short, padding with silence")
+            while limit > 0:
+                chunk = bytes(min(limit, AudioChunkGenerator.CHUNK_SIZE))
+                limit -= len(chunk)
+                yield chunk
+    finally:
+        # Leaving early doesn't finalize generate(), release cdparanoia here
+        await generator.stop()
+
+class PipeStreamingResponse(StreamingResponse):
+    """Hands the cdparanoia pipe to the server when it supports zero-copy send"""
+    def __init__(self, generator: AudioChunkGenerator, header: bytes, data_size: int, **kwargs):
+        super().__init__(wav_stream(generator, header, limit=len(header) + data_size), **kwargs)
+        self.generator = generator
+        self.header = header
+        self.data_size = data_size
+
+    async def __call__(self, scope, receive, send):
+        if ZEROCOPY_SEND not in scope.get("extensions", {}):
+            # Server can't move bytes fd-to-fd, stream through Python instead
+            await super().__call__(scope, receive, send)
+            return
+
+        logger.debug(f"Zero-copy streaming track {self.generator.track_number}")
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers
+            })
+            await send({
+                "type": "http.response.body",
+                "body": self.header,
+                "more_body": True
+            })
+            with os.fdopen(os.dup(self.generator.stdout_fd), "rb", buffering=0) as pipe:
+                await send({
+                    "type": ZEROCOPY_SEND,
+                    "file": pipe,
+                    "count": self.data_size,
+                    "more_body": False
+                })
+        finally:
+            await self.generator.stop()
 
 # Global instances
 generator_lock = asyncio.Lock()
 buffer_manager = TrackBufferManager()
-active_generators = {}
+active_generators: Dict[int, AudioChunkGenerator] = {}  # Running readers by track number
+
+async def fetch_musicbrainz_info(disc) -> Optional[CDInfo]:
+    """Look up CD info on MusicBrainz, returns None when no usable release is found"""
+    try:
+        resp = await musicbrainz_client.get(
+            MUSICBRAINZ_DISCID_URL.format(disc_id=disc.id),
+            params={"fmt": "json", "inc": "artists recordings"}
+        )
+        resp.raise_for_status()
+        result = orjson.loads(resp.content)
+        logger.debug("Retrieved MusicBrainz data")
+        
+        if result and result.get('releases'):
+            release = result['releases'][0]
+            
+            logger.debug(f"Release data: {release.keys()}")
+            
+            # Get artist credit
+            artist = "Unknown Artist"
+            if 'artist-credit' in release:
+                logger.debug(f"Artist credit: {release['artist-credit']}")
+                try:
+                    artist_credit = release['artist-credit']
+                    if isinstance(artist_credit, list) and len(artist_credit) > 0:
+                        artist = artist_credit[0]['artist']['name']
+                    elif isinstance(artist_credit, dict):
+                        artist = artist_credit['name']
+                except (KeyError, IndexError) as e:
+                    logger.debug(f"Error extracting artist name: {e}")
+            
+            logger.debug(f"Artist: {artist}")
+            
+            tracks = [
+                TrackInfo(
+                    number=int(track.get('position', 0)),
+                    title=track.get('recording', {}).get('title') or f"Track {track.get('position', '?')}",
+                    duration=int(track.get('length') or 0) // 1000  # Convert milliseconds to seconds
+                )
+                for medium in release.get('media', [])
+                for track in medium.get('tracks', [])
+            ]
+            
+            if tracks:
+                logger.debug(f"Successfully created CD info from MusicBrainz with {len(tracks)} tracks")
+                info = CDInfo(
+                    title=release.get('title', 'Unknown Album'),
+                    artist=artist,
+                    tracks=tracks
+                )
+                logger.debug(f"CD Info: Title: {info.title}, Artist: {info.artist}, Tracks: {len(info.tracks)}")
+                return info
+            logger.info("No valid track data from MusicBrainz, using generic")
+        else:
+            logger.info("No release data from MusicBrainz, using generic")
+        
+    except Exception as e:
+        logger.info(f"Error processing MusicBrainz data: {e}, using generic")
+    return None
+
+async def read_disc():
+    """Read the disc TOC, reusing the last read while the device is unchanged"""
+    st = os.stat("/dev/cdrom")
+    if (_toc_cache["disc"] is not None and
+        _toc_cache["mtime"] == st.st_mtime and
+        time.time() - _toc_cache["t"] < TOC_CACHE_TTL):
+        return _toc_cache["disc"]
+
+    disc = await asyncio.to_thread(discid.read, "/dev/cdrom")
+    _toc_cache["mtime"] = st.st_mtime
+    _toc_cache["disc"] = disc
+    _toc_cache["t"] = time.time()
+    # Track sizes follow every TOC read so a swapped disc is never checked against the old one
+    cd_info_cache["track_sizes"] = [track.sectors * CD_SECTOR_SIZE for track in disc.tracks]
+    return disc
 
 async def read_cd_info():
     """Read CD info and cache it"""
@@ -347,7 +839,7 @@ async def read_cd_info():
             raise HTTPException(status_code=404, detail="CD device not found")
 
         try:
-            disc = discid.read("/dev/cdrom")
+            disc = await read_disc()
             logger.debug(f"Disc ID: {disc.id}")
             
             # Check cache
@@ -357,72 +849,24 @@ async def read_cd_info():
                 logger.debug("Returning cached CD info")
                 return cd_info_cache["info"]
             
-            try:
-                result = musicbrainzngs.get_releases_by_discid(disc.id, includes=["artists", "recordings"])
-                logger.debug("Retrieved MusicBrainz data")
-                
-                if result and 'disc' in result and 'release-list' in result['disc']:
-                    release = result['disc']['release-list'][0]
-                    
-                    logger.debug(f"Release data: {release.keys()}")
-                    
-                    # Get artist credit
-                    artist = "Unknown Artist"
-                    if 'artist-credit' in release:
-                        logger.debug(f"Artist credit: {release['artist-credit']}")
-                        try:
-                            artist_credit = release['artist-credit']
-                            if isinstance(artist_credit, list) and len(artist_credit) > 0:
-                                artist = artist_credit[0]['artist']['name']
-                            elif isinstance(artist_credit, dict):
-                                artist = artist_credit['name']
-                        except (KeyError, IndexError) as e:
-                            logger.debug(f"Error extracting artist name: {e}")
-                    
-                    logger.debug(f"Artist: {artist}")
-                    
-                    tracks = []
-                    if 'medium-list' in release:
-                        for medium in release['medium-list']:
-                            if 'track-list' in medium:
-                                logger.debug(f"Track list found: {len(medium['track-list'])} tracks")
-                                for track in medium['track-list']:
-                                    try:
-                                        track_title = track.get('recording', {}).get('title', f"Track {track.get('position', '?')}")
-                                        track_length = int(track.get('length', 0))
-                                        track_number = int(track.get('position', 0))
-                                        
-                                        tracks.append(TrackInfo(
-                                            number=track_number,
-                                            title=track_title,
-                                            duration=track_length // 1000  # Convert milliseconds to seconds
-                                        ))
-                                        logger.debug(f"Added track: {track_number}. {track_title} ({track_length}ms)")
-                                    except Exception as e:
-                                        logger.debug(f"Error processing track: {e}")
-                    
-                    if tracks:
-                        logger.debug(f"Successfully created CD info from MusicBrainz with {len(tracks)} tracks")
-                        info = CDInfo(
-                            title=release.get('title', 'Unknown Album'),
-                            artist=artist,
-                            tracks=tracks
-                        )
-                        logger.debug(f"CD Info: Title: {info.title}, Artist: {info.artist}, Tracks: {len(info.tracks)}")
-                    else:
-                        logger.info("No valid track data from MusicBrainz, using generic")
-                        info = create_generic_cd_info(disc)
+            store = get_cd_info_store()
+            cached = await asyncio.to_thread(store.get, disc.id) if store is not None else None
+            if cached is not None:
+                logger.debug("Using CD info from persistent cache")
+                info = CDInfo.model_validate_json(cached)
+            else:
+                info = await fetch_musicbrainz_info(disc)
+                if info is not None:
+                    if store is not None:
+                        await asyncio.to_thread(store.set, disc.id, info.model_dump_json(),
+                                                expire=CD_INFO_STORE_TTL)
                 else:
-                    logger.info("No release data from MusicBrainz, using generic")
                     info = create_generic_cd_info(disc)
-                
-            except Exception as e:
-                logger.info(f"Error processing MusicBrainz data: {e}, using generic")
-                info = create_generic_cd_info(disc)
             
             # Update cache
             cd_info_cache["disc_id"] = disc.id
             cd_info_cache["info"] = info
+            cd_info_cache["json_bytes"] = orjson.dumps(info.model_dump())
             cd_info_cache["last_check"] = time.time()
             
             return info
@@ -435,40 +879,133 @@ async def read_cd_info():
         logger.error(f"Error reading CD: {e}")
         raise HTTPException(status_code=404, detail=str(e))
 
+async def validate_track_number(track_number: int):
+    """Check a track number against the TOC of the disc currently in the drive"""
+    try:
+        await read_disc()
+    except Exception as e:
+        logger.error(f"Error reading disc: {e}")
+        raise HTTPException(status_code=404, detail=f"Error reading CD: {str(e)}")
+    if track_number < 1 or track_number > len(cd_info_cache["track_sizes"]):
+        raise HTTPException(status_code=400, detail="Invalid track number")
+
 @app.get("/cd/info")
 async def get_cd_info():
     logger.debug("CD info request received")
-    return await read_cd_info()
+    await read_cd_info()
+    return Response(content=cd_info_cache["json_bytes"], media_type="application/json")
+
+def parse_range(range_header: Optional[str], total_size: int):
+    """Parse a single bytes=start-end range, returns (start, end) or None to serve the whole track
+
+    Headers in another unit, with several ranges or otherwise malformed are
+    ignored as RFC 9110 allows. Raises ValueError for a well-formed bytes
+    range that can't be satisfied.
+    """
+    if not range_header:
+        return None
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if not match.group(1):
+        # Suffix range: the last N bytes
+        if int(match.group(2)) == 0:
+            raise ValueError(f"Unsatisfiable range: {range_header}")
+        start = max(total_size - int(match.group(2)), 0)
+        end = total_size - 1
+    else:
+        start = int(match.group(1))
+        if match.group(2) and int(match.group(2)) < start:
+            # last-pos before first-pos is invalid syntax, which is ignored
+            return None
+        end = min(int(match.group(2)), total_size - 1) if match.group(2) else total_size - 1
+    if start >= total_size:
+        raise ValueError(f"Unsatisfiable range: {range_header}")
+    return start, end
 
 @app.get("/cd/play/{track_number}")
-async def play_track(track_number: int, background_tasks: BackgroundTasks):
+async def play_track(track_number: int, request: Request, background_tasks: BackgroundTasks):
     logger.info(f"Play track request received for track {track_number}")
     try:
         # Stop any existing playback first
         await stop_playback()
         
-        cd_info = await read_cd_info()
-        if track_number < 1 or track_number > len(cd_info.tracks):
-            raise HTTPException(status_code=400, detail="Invalid track number")
+        await validate_track_number(track_number)
+
+        data_size = track_pcm_size(track_number)
+        headers = {
+            'Content-Type': 'audio/wav',
+            'Cache-Control': 'no-cache',
+            'Accept-Ranges': 'bytes'
+        }
 
+        total_size = WAV_HEADER_SIZE + data_size
+        try:
+            byte_range = parse_range(request.headers.get('range'), total_size)
+        except ValueError as e:
+            logger.info(f"Rejecting range for track {track_number}: {e}")
+            return Response(status_code=416, headers={'Content-Range': f'bytes */{total_size}'})
+        start, end = byte_range or (0, total_size - 1)
+
+        # Seek cdparanoia to the sector holding the first requested sample
+        pcm_offset = max(start - WAV_HEADER_SIZE, 0)
+        generator = AudioChunkGenerator(track_number, pcm_offset // CD_SECTOR_SIZE)
+        await generator.start()
+
+        headers['Content-Length'] = str(end - start + 1)
+        if byte_range:
+            headers['Content-Range'] = f'bytes {start}-{end}/{total_size}'
+
+        return StreamingResponse(
+            wav_stream(
+                generator,
+                wav_header(data_size)[start:],
+                skip=pcm_offset % CD_SECTOR_SIZE,
+                limit=end - start + 1
+            ),
+            status_code=206 if byte_range else 200,
+            headers=headers,
+            media_type="audio/wav"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting playback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cd/play_raw/{track_number}")
+async def play_track_raw(track_number: int):
+    """Play a track, letting the server splice the cdparanoia pipe to the socket"""
+    logger.info(f"Raw play track request received for track {track_number}")
+    try:
+        await stop_playback()
+
+        await validate_track_number(track_number)
+
+        data_size = track_pcm_size(track_number)
         generator = AudioChunkGenerator(track_number)
         await generator.start()
 
+        # A fixed length lets the server splice the body without chunk framing
         headers = {
             'Content-Type': 'audio/wav',
             'Cache-Control': 'no-cache',
-            'Accept-Ranges': 'bytes',
-            'Transfer-Encoding': 'chunked'
+            'Content-Length': str(WAV_HEADER_SIZE + data_size)
         }
 
-        return StreamingResponse(
-            generator.generate(),
+        return PipeStreamingResponse(
+            generator,
+            wav_header(data_size),
+            data_size,
             headers=headers,
             media_type="audio/wav"
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error starting playback: {e}")
+        logger.error(f"Error starting raw playback: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cd/stop")
@@ -487,17 +1024,19 @@ async def stop_playback():
             # Clear the generators
             active_generators.clear()
 
-        # Clean up any orphaned processes
-        try:
-            cleanup_orphaned_processes()
-        except Exception as e:
-            logger.error(f"Error in cleanup: {e}")
-
-        # Kill any remaining cdparanoia processes
-        try:
-            subprocess.run(['pkill', '-9', 'cdparanoia'], capture_output=True)
-        except Exception as e:
-            logger.error(f"Error killing processes: {e}")
+        # Kill any remaining cdparanoia processes we spawned
+        for process in list(AudioChunkGenerator.running_processes):
+            if process.returncode is not None:
+                # Already reaped, its pid may belong to another process by now
+                AudioChunkGenerator.running_processes.discard(process)
+                continue
+            try:
+                process.kill()
+                logger.debug(f"Killed cdparanoia process {process.pid}")
+            except ProcessLookupError:
+                AudioChunkGenerator.running_processes.discard(process)
+            except Exception as e:
+                logger.error(f"Error killing process {process.pid}: {e}")
         
         return {"status": "stopped"}
     except Exception as e:
@@ -535,7 +1074,7 @@ def cleanup_orphaned_processes():
     except Exception as e:
         logger.error(f"Error in cleanup_orphaned_processes: {e}")
 
-async def graceful_shutdown(signal_num, frame):
+async def graceful_shutdown():
     """Handle graceful shutdown"""
     global cleanup_in_progress
     
@@ -555,7 +1094,7 @@ async def graceful_shutdown(signal_num, frame):
         active_generators.clear()
         
         # Clean up any orphaned processes
-        cleanup_orphaned_processes()
+        await asyncio.to_thread(cleanup_orphaned_processes)
         
     except Exception as e:
         logger.error(f"Error during graceful shutdown: {e}")
@@ -570,20 +1109,14 @@ async def periodic_cleanup():
         try:
             await asyncio.sleep(300)  # Run every 5 minutes
             if not cleanup_in_progress:
-                cleanup_orphaned_processes()
+                await asyncio.to_thread(cleanup_orphaned_processes)
         except Exception as e:
             logger.error(f"Error in periodic cleanup: {e}")
 
-# Update the main block to include signal handlers and cleanup
+# uvicorn handles SIGTERM/SIGINT and runs graceful_shutdown from the lifespan handler
 if __name__ == "__main__":
     import uvicorn
     
-    # Set up signal handlers
-    signal.signal(signal.SIGTERM, graceful_shutdown)
-    signal.signal(signal.SIGINT, graceful_shutdown)
-    
-    # Start periodic cleanup task
-    asyncio.create_task(periodic_cleanup())
-    
     logger.info("Starting CD Player backend service")
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    uvicorn.run(app, host="0.0.0.0", port=3000, http=StreamingHttpProtocol, backlog=2048,
+                timeout_graceful_shutdown=5)  # Open streams would otherwise hold shutdown for a whole track